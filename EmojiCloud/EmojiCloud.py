@@ -4,8 +4,12 @@ import matplotlib.pyplot as plt
 import copy
 import math
 import collections
+import functools
 import EmojiCloud
 
+# key: emoji vendor, value: the folder of raw emojis under data/
+DICT_VENDOR = {'Apple':'Appl', 'Google':'Goog', 'Meta':'FB', 'Windows':'Wind', 'Twitter':'Twtr', 'JoyPixels':'Joy', 'Samsung':'Sams'}
+
 def distance_between_two_points(x_1, y_1, x_2, y_2):
     """calculate the distance between two points
 
@@ -336,6 +340,19 @@ def rename_emoji_image_in_unicode(dict_weight):
         dict_rename[im_rename] = dict_weight[im_name]
     return dict_rename
 
+@functools.lru_cache(maxsize=None)
+def load_emoji_image(path_img):
+    """load a bundled emoji image in RGBA, cached so that repeated plots reuse the decoded image
+
+    Args:
+        path_img (string): the path of the emoji image under data/, customized emoji images should not be cached
+
+    Returns:
+        im_read: the emoji image in RGBA, which should not be modified in place
+    """
+    im_read = Image.open(path_img)
+    return im_read.convert('RGBA')
+
 def generate_resized_emoji_images(path_img_raw, dict_weight, canvas_area, dict_customized, relax_ratio = 1.5):
     """generate the resized emoji images based on weights
 
@@ -361,7 +378,7 @@ def generate_resized_emoji_images(path_img_raw, dict_weight, canvas_area, dict_c
     norm_area_sum = 0
     for im_name in dict_weight:
         if im_name not in dict_customized:
-            im_read = Image.open(EmojiCloud.__path__[0] + '/' + os.path.join(path_img_raw, im_name))
+            im_read = load_emoji_image(EmojiCloud.__path__[0] + '/' + os.path.join(path_img_raw, im_name))
         else:
             im_read = Image.open(dict_customized[im_name])
         width, height = im_read.getdata().size
@@ -375,10 +392,9 @@ def generate_resized_emoji_images(path_img_raw, dict_weight, canvas_area, dict_c
     for item in list_sorted_emoji:
         im_name, weight = item[0], item[1]
         if im_name not in dict_customized:
-            im_read = Image.open(EmojiCloud.__path__[0] + '/' + os.path.join(path_img_raw, im_name))
+            im_read = load_emoji_image(EmojiCloud.__path__[0] + '/' + os.path.join(path_img_raw, im_name))
         else:
-            im_read = Image.open(dict_customized[im_name])
-        im_read = im_read.convert('RGBA')
+            im_read = Image.open(dict_customized[im_name]).convert('RGBA')
         resize_img = resize_img_based_weight(im_read, weight)
         list_resize_img.append(resize_img)
     return list_sorted_emoji, list_resize_img
@@ -484,39 +500,66 @@ def plot_emoji_cloud_given_relax_ratio(path_img_raw, canvas_img, canvas_w, canva
         new_list_canvas_pix = list(OrderedSet(new_list_canvas_pix) - OrderedSet(list_occupied))
     return new_canvas_img, count_plot
 
-def plot_dense_emoji_cloud(canvas_w, canvas_h, canvas_area, map_occupied, canvas_center_x, canvas_center_y, path_img_raw, saved_emoji_cloud_name, canvas_img, dict_weight, dict_customized, thold_alpha_bb, num_try=20, step_size=0.1):
-    """plot dense emoji cloud
+def generate_dense_emoji_cloud(canvas_w, canvas_h, canvas_area, map_occupied, list_canvas_pix, path_img_raw, canvas_img, dict_weight, dict_customized, thold_alpha_bb, num_try=20, step_size=0.1):
+    """generate dense emoji cloud without showing or saving it
 
     Args:
         canvas_w (int): the canvas width
         canvas_h (int): the canvas height
         canvas_area: the area of canvas 
         map_occupied (list): a 2D list of whether the pixel is occupied or not 
-        canvas_center_x (float): the center x of the canvas
-        canvas_center_y (float): the center y of the canvas
+        list_canvas_pix (list): a list of tuple (x,y) sorted by its distance to the canvas center
         path_img_raw (string): the path of raw emoji images 
-        saved_emoji_cloud_name (string): the name of the saved emoji cloud image  
         canvas_img: the image of canvas
         dict_weight (dict): key: emoji image name in unicode, value: weight
         dict_customized (dict): key: emoji image name in unicode, value: the path of customized emoji image
         thold_alpha_bb: the threshold to distinguish white and non-white colors for bounding box detection 
         num_try: number of attempts to increase the relaxed ratio of emoji images 
         step_size: the step size of increase the relaxed ratio of emoji images 
+
+    Returns:
+        canvas_img_plot: the image of the last attempt, None if num_try is 0
+        count_plot: the count of plotted emojis in the last attempt
     """
-    # a sorted list of available pixel positions for plotting
-    list_canvas_pix = calculate_sorted_canvas_pix_for_plotting(canvas_w, canvas_h, map_occupied, canvas_center_x, canvas_center_y)
+    canvas_img_plot, count_plot = None, 0
     # plot emoji cloud with an increasing relax_ratio with a fixed step size
     for i in range(num_try):
         relax_ratio = 1 + step_size*i
         canvas_img_plot, count_plot = plot_emoji_cloud_given_relax_ratio(path_img_raw, canvas_img, canvas_w, canvas_h, canvas_area, dict_weight, list_canvas_pix, map_occupied, dict_customized, thold_alpha_bb, relax_ratio)
         # plot all emojis successfully 
         if (count_plot == len(dict_weight)):
-            # show emoji cloud 
-            plt.imshow(canvas_img_plot)
-            plt.show()
-            # save emoji cloud
-            canvas_img_plot.save(saved_emoji_cloud_name)
             break 
+    return canvas_img_plot, count_plot
+
+def plot_dense_emoji_cloud(canvas_w, canvas_h, canvas_area, map_occupied, canvas_center_x, canvas_center_y, path_img_raw, saved_emoji_cloud_name, canvas_img, dict_weight, dict_customized, thold_alpha_bb, num_try=20, step_size=0.1):
+    """plot dense emoji cloud
+
+    Args:
+        canvas_w (int): the canvas width
+        canvas_h (int): the canvas height
+        canvas_area: the area of canvas 
+        map_occupied (list): a 2D list of whether the pixel is occupied or not 
+        canvas_center_x (float): the center x of the canvas
+        canvas_center_y (float): the center y of the canvas
+        path_img_raw (string): the path of raw emoji images 
+        saved_emoji_cloud_name (string): the name of the saved emoji cloud image  
+        canvas_img: the image of canvas
+        dict_weight (dict): key: emoji image name in unicode, value: weight
+        dict_customized (dict): key: emoji image name in unicode, value: the path of customized emoji image
+        thold_alpha_bb: the threshold to distinguish white and non-white colors for bounding box detection 
+        num_try: number of attempts to increase the relaxed ratio of emoji images 
+        step_size: the step size of increase the relaxed ratio of emoji images 
+    """
+    # a sorted list of available pixel positions for plotting
+    list_canvas_pix = calculate_sorted_canvas_pix_for_plotting(canvas_w, canvas_h, map_occupied, canvas_center_x, canvas_center_y)
+    canvas_img_plot, count_plot = generate_dense_emoji_cloud(canvas_w, canvas_h, canvas_area, map_occupied, list_canvas_pix, path_img_raw, canvas_img, dict_weight, dict_customized, thold_alpha_bb, num_try, step_size)
+    # plot all emojis successfully 
+    if (count_plot == len(dict_weight)):
+        # show emoji cloud 
+        plt.imshow(canvas_img_plot)
+        plt.show()
+        # save emoji cloud
+        canvas_img_plot.save(saved_emoji_cloud_name)
 
 def plot_masked_canvas(img_mask, thold_alpha_contour, contour_width, contour_color, emoji_vendor, dict_weight, saved_emoji_cloud_name, dict_customized={}, thold_alpha_bb=4):
     """plot emoji cloud with masked canvas
@@ -533,8 +576,7 @@ def plot_masked_canvas(img_mask, thold_alpha_contour, contour_width, contour_col
         thold_alpha_bb: the threshold to distinguish white and non-white colors for bounding box detection 
     """    
     canvas_img, map_occupied, canvas_area, canvas_center_x, canvas_center_y, canvas_w, canvas_h = create_masked_canvas(img_mask, contour_width, contour_color, thold_alpha_contour, thold_alpha_bb)
-    dict_vendor = {'Apple':'Appl', 'Google':'Goog', 'Meta':'FB', 'Windows':'Wind', 'Twitter':'Twtr', 'JoyPixels':'Joy', 'Samsung':'Sams'}
-    path_img_raw = 'data/' + dict_vendor[emoji_vendor] # path of raw emojis
+    path_img_raw = 'data/' + DICT_VENDOR[emoji_vendor] # path of raw emojis
     plot_dense_emoji_cloud(canvas_w, canvas_h, canvas_area, map_occupied, canvas_center_x, canvas_center_y, path_img_raw, saved_emoji_cloud_name, canvas_img, dict_weight, dict_customized, thold_alpha_bb, num_try=20, step_size=0.1)
 
 def plot_rectangle_canvas(canvas_w, canvas_h, emoji_vendor, dict_weight, saved_emoji_cloud_name, dict_customized={}, canvas_color='white', thold_alpha_bb=4):
@@ -551,8 +593,7 @@ def plot_rectangle_canvas(canvas_w, canvas_h, emoji_vendor, dict_weight, saved_e
         thold_alpha_bb: the threshold to distinguish white and non-white colors for bounding box detection 
     """    
     canvas_img, map_occupied, canvas_area, canvas_center_x, canvas_center_y = create_rectangle_canvas(canvas_w, canvas_h, canvas_color)
-    dict_vendor = {'Apple':'Appl', 'Google':'Goog', 'Meta':'FB', 'Windows':'Wind', 'Twitter':'Twtr', 'JoyPixels':'Joy', 'Samsung':'Sams'}
-    path_img_raw = 'data/' + dict_vendor[emoji_vendor] # path of raw emojis
+    path_img_raw = 'data/' + DICT_VENDOR[emoji_vendor] # path of raw emojis
     plot_dense_emoji_cloud(canvas_w, canvas_h, canvas_area, map_occupied, canvas_center_x, canvas_center_y, path_img_raw, saved_emoji_cloud_name, canvas_img, dict_weight, dict_customized, thold_alpha_bb, num_try=20, step_size=0.1)
 
 def plot_ellipse_canvas(canvas_w, canvas_h, emoji_vendor, dict_weight, saved_emoji_cloud_name, dict_customized={}, canvas_color='white', thold_alpha_bb=4):
@@ -569,7 +610,6 @@ def plot_ellipse_canvas(canvas_w, canvas_h, emoji_vendor, dict_weight, saved_emo
         thold_alpha_bb: the threshold to distinguish white and non-white colors for bounding box detection 
     """    
     canvas_img, map_occupied, canvas_area, canvas_center_x, canvas_center_y = create_ellipse_canvas(canvas_w, canvas_h, canvas_color)
-    dict_vendor = {'Apple':'Appl', 'Google':'Goog', 'Meta':'FB', 'Windows':'Wind', 'Twitter':'Twtr', 'JoyPixels':'Joy', 'Samsung':'Sams'}
-    path_img_raw = 'data/' + dict_vendor[emoji_vendor] # path of raw emojis
+    path_img_raw = 'data/' + DICT_VENDOR[emoji_vendor] # path of raw emojis
     plot_dense_emoji_cloud(canvas_w, canvas_h, canvas_area, map_occupied, canvas_center_x, canvas_center_y, path_img_raw, saved_emoji_cloud_name, canvas_img, dict_weight, dict_customized, thold_alpha_bb, num_try=20, step_size=0.1)
 
@@ -0,0 +1,4 @@
+import sys
+from EmojiCloud import batch
+
+sys.exit(batch.main())
@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import time
+import argparse
+import uuid
+import concurrent.futures
+from EmojiCloud import EmojiCloud
+
+def parse_job_line(line):
+    """parse one JSONL job spec
+
+    Args:
+        line (string): a line of the job file, e.g., {"canvas": "ellipse", "width": 720, "height": 360, "vendor": "Twitter", "weights": {"1f602": 1.3}, "output": "cloud.png"}
+
+    Returns:
+        job (dict): the job spec, None for a blank line
+    """
+    line = line.strip()
+    if (not line):
+        return None
+    job = json.loads(line)
+    for key in ['weights', 'output']:
+        if key not in job:
+            raise ValueError('job is missing the required key: ' + key)
+    weights = job['weights']
+    if not (isinstance(weights, dict) and weights and all(isinstance(w, (int, float)) and not isinstance(w, bool) and w > 0 for w in weights.values())):
+        raise ValueError('weights should be a non-empty dict of positive numbers')
+    canvas_type = job.get('canvas', 'rectangle')
+    if canvas_type not in ['rectangle', 'ellipse', 'masked']:
+        raise ValueError('canvas should be one of rectangle, ellipse, and masked')
+    if (canvas_type == 'masked'):
+        if 'mask' not in job:
+            raise ValueError('masked canvas is missing the required key: mask')
+        contour_color = job.get('contour_color', [0, 0, 0, 255])
+        if not (isinstance(contour_color, list) and len(contour_color) in [3, 4] and all(isinstance(c, int) and not isinstance(c, bool) and 0 <= c <= 255 for c in contour_color)):
+            raise ValueError('contour_color should be a list of 3 or 4 integers between 0 and 255')
+    else:
+        for key in ['width', 'height']:
+            if key not in job:
+                raise ValueError(canvas_type + ' canvas is missing the required key: ' + key)
+            if not (isinstance(job[key], int) and not isinstance(job[key], bool) and job[key] > 0):
+                raise ValueError(key + ' should be a positive integer')
+    if job.get('vendor', 'Twitter') not in EmojiCloud.DICT_VENDOR:
+        raise ValueError('vendor should be one of ' + ', '.join(EmojiCloud.DICT_VENDOR))
+    return job
+
+def get_canvas_key(job):
+    """get the key identifying the canvas template of a job
+
+    Args:
+        job (dict): the job spec
+
+    Returns:
+        canvas_key (tuple): jobs with the same key share the same canvas template
+    """
+    canvas_type = job.get('canvas', 'rectangle')
+    thold_alpha_bb = job.get('thold_alpha_bb', 4)
+    if (canvas_type == 'masked'):
+        return (canvas_type, job['mask'], job.get('contour_width', 5), tuple(job.get('contour_color', [0, 0, 0, 255])), job.get('thold_alpha_contour', 10), thold_alpha_bb)
+    canvas_color = job.get('canvas_color', 'white')
+    if isinstance(canvas_color, list):
+        canvas_color = tuple(canvas_color)
+    return (canvas_type, job['width'], job['height'], canvas_color)
+
+def create_canvas_template(canvas_key):
+    """create the canvas template of a given canvas key
+
+    Args:
+        canvas_key (tuple): the key returned by get_canvas_key
+
+    Returns:
+        canvas_template (tuple): canvas_img, map_occupied, canvas_area, canvas_w, canvas_h, list_canvas_pix
+    """
+    canvas_type = canvas_key[0]
+    if (canvas_type == 'masked'):
+        img_mask, contour_width, contour_color, thold_alpha_contour, thold_alpha_bb = canvas_key[1:]
+        canvas_img, map_occupied, canvas_area, canvas_center_x, canvas_center_y, canvas_w, canvas_h = EmojiCloud.create_masked_canvas(img_mask, contour_width, contour_color, thold_alpha_contour, thold_alpha_bb)
+    else:
+        canvas_w, canvas_h, canvas_color = canvas_key[1:]
+        if (canvas_type == 'ellipse'):
+            canvas_img, map_occupied, canvas_area, canvas_center_x, canvas_center_y = EmojiCloud.create_ellipse_canvas(canvas_w, canvas_h, canvas_color)
+        else:
+            canvas_img, map_occupied, canvas_area, canvas_center_x, canvas_center_y = EmojiCloud.create_rectangle_canvas(canvas_w, canvas_h, canvas_color)
+    list_canvas_pix = EmojiCloud.calculate_sorted_canvas_pix_for_plotting(canvas_w, canvas_h, map_occupied, canvas_center_x, canvas_center_y)
+    return canvas_img, map_occupied, canvas_area, canvas_w, canvas_h, list_canvas_pix
+
+def save_emoji_cloud(canvas_img, saved_emoji_cloud_name):
+    """save an emoji cloud through a temporary file, so that an interrupted run never leaves a partial output behind
+
+    Args:
+        canvas_img: the image of the emoji cloud
+        saved_emoji_cloud_name (string): the name of the saved emoji cloud image
+
+    Returns:
+        write_seconds (float): the time spent on writing the image
+    """
+    start = time.perf_counter()
+    dir_name, base_name = os.path.split(saved_emoji_cloud_name)
+    if (dir_name):
+        os.makedirs(dir_name, exist_ok=True)
+    # a unique temporary file keeping the extension so that PIL infers the same image format,
+    # created with the process umask applied as a plain save would
+    tmp_name = os.path.join(dir_name, '.tmp-' + uuid.uuid4().hex + os.path.splitext(base_name)[1])
+    os.close(os.open(tmp_name, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666))
+    try:
+        canvas_img.save(tmp_name)
+        os.replace(tmp_name, saved_emoji_cloud_name)
+    finally:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+    return time.perf_counter() - start
+
+def render_job(job, dict_canvas_template, num_try=20, step_size=0.1):
+    """render the emoji cloud of a job with cached canvas templates
+
+    Args:
+        job (dict): the job spec
+        dict_canvas_template (dict): key: canvas key, value: canvas template, filled on demand
+        num_try: number of attempts to increase the relaxed ratio of emoji images
+        step_size: the step size of increase the relaxed ratio of emoji images
+
+    Returns:
+        canvas_img_plot: the image of the emoji cloud
+        count_plot: the count of plotted emojis
+    """
+    canvas_key = get_canvas_key(job)
+    if canvas_key not in dict_canvas_template:
+        dict_canvas_template[canvas_key] = create_canvas_template(canvas_key)
+    canvas_img, map_occupied, canvas_area, canvas_w, canvas_h, list_canvas_pix = dict_canvas_template[canvas_key]
+    path_img_raw = 'data/' + EmojiCloud.DICT_VENDOR[job.get('vendor', 'Twitter')] # path of raw emojis
+    return EmojiCloud.generate_dense_emoji_cloud(canvas_w, canvas_h, canvas_area, map_occupied, list_canvas_pix, path_img_raw, canvas_img, job['weights'], job.get('customized', {}), job.get('thold_alpha_bb', 4), num_try, step_size)
+
+def run_batch(file_job, file_report, workers=4, overwrite=False):
+    """render all jobs in a JSONL job file in one process and write the outputs in parallel
+
+    Args:
+        file_job (file): the JSONL job file, one job spec per line
+        file_report (file): the JSONL report file, one record per job in the order of the job file
+        workers (int, optional): the number of threads writing outputs. Defaults to 4.
+        overwrite (bool, optional): render jobs whose outputs already exist. Defaults to False.
+
+    Returns:
+        dict_status (dict): key: job status, value: the count of jobs
+    """
+    dict_canvas_template = {} # key: canvas key, value: canvas template
+    dict_status = {}
+    set_output = set() # outputs submitted for writing in this run
+
+    def report(record):
+        dict_status[record['status']] = dict_status.get(record['status'], 0) + 1
+        file_report.write(json.dumps(record) + '\n')
+        file_report.flush()
+
+    def finish(future, record):
+        if future is not None:
+            try:
+                record['write_seconds'] = round(future.result(), 6)
+            except Exception as e:
+                record['status'] = 'error'
+                record['error'] = repr(e)
+        report(record)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        # a list of (future, record) in job order, future is None for jobs with nothing to write
+        list_pending = []
+        count_writing = 0
+        for line_no, line in enumerate(file_job, 1):
+            record = {'line': line_no}
+            future = None
+            try:
+                job = parse_job_line(line)
+                if job is None:
+                    continue
+                record['id'] = job.get('id', line_no)
+                record['output'] = job['output']
+                record['total'] = len(job['weights'])
+                # checked before resuming, as the output of an earlier job may not be written yet
+                output_key = os.path.abspath(job['output'])
+                if output_key in set_output:
+                    raise ValueError('output is the same as an earlier job: ' + job['output'])
+                # resume by skipping jobs done in a previous run
+                if (not overwrite and os.path.exists(job['output'])):
+                    record['status'] = 'skipped'
+                else:
+                    start = time.perf_counter()
+                    canvas_img_plot, count_plot = render_job(job, dict_canvas_template)
+                    record['render_seconds'] = round(time.perf_counter() - start, 6)
+                    record['placed'] = count_plot
+                    # fail to plot all emojis with any relaxed ratio
+                    if (count_plot != record['total']):
+                        record['status'] = 'failed'
+                    else:
+                        record['status'] = 'ok'
+                        set_output.add(output_key)
+                        future = executor.submit(save_emoji_cloud, canvas_img_plot, job['output'])
+                        count_writing += 1
+            except Exception as e:
+                record['status'] = 'error'
+                record['error'] = repr(e)
+            list_pending.append((future, record))
+            # report in job order, waiting for the oldest write only to bound the images held in memory
+            while list_pending and (list_pending[0][0] is None or list_pending[0][0].done() or count_writing > workers*2):
+                future, record = list_pending.pop(0)
+                if future is not None:
+                    count_writing -= 1
+                finish(future, record)
+        for future, record in list_pending:
+            finish(future, record)
+    return dict_status
+
+def positive_int(value):
+    """parse a positive integer command-line argument
+
+    Args:
+        value (string): the argument value
+
+    Returns:
+        int: the positive integer
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError('invalid int value: ' + repr(value))
+    if (number < 1):
+        raise argparse.ArgumentTypeError('should be at least 1: ' + value)
+    return number
+
+def main(argv=None):
+    """the command-line entry point of the batch renderer
+
+    Args:
+        argv (list, optional): the command-line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: the exit code, 1 if any job fails
+    """
+    parser = argparse.ArgumentParser(prog='python -m EmojiCloud', description='render emoji clouds from a JSONL job file')
+    parser.add_argument('jobs', nargs='?', default='-', help='the JSONL job file, - for stdin (default)')
+    parser.add_argument('-r', '--report', default='-', help='the JSONL report file, - for stdout (default)')
+    parser.add_argument('-w', '--workers', type=positive_int, default=4, help='the number of threads writing outputs (default: 4)')
+    parser.add_argument('--overwrite', action='store_true', help='render jobs whose outputs already exist')
+    args = parser.parse_args(argv)
+    file_job = sys.stdin if args.jobs == '-' else open(args.jobs, encoding='utf-8')
+    file_report = sys.stdout if args.report == '-' else open(args.report, 'a', encoding='utf-8')
+    try:
+        dict_status = run_batch(file_job, file_report, args.workers, args.overwrite)
+    finally:
+        if file_job is not sys.stdin:
+            file_job.close()
+        if file_report is not sys.stdout:
+            file_report.close()
+    print(', '.join(status + ': ' + str(count) for status, count in sorted(dict_status.items())), file=sys.stderr)
+    return 1 if (dict_status.get('failed') or dict_status.get('error')) else 0
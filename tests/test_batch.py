@@ -0,0 +1,115 @@
+import io
+import os
+import sys
+import json
+import pytest
+from EmojiCloud import batch
+
+class FakeImage:
+    """a stand-in for a rendered emoji cloud, so that the batch logic is tested without pixel rendering"""
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(b'emoji cloud')
+
+def fake_render_job(job, dict_canvas_template, num_try=20, step_size=0.1):
+    # jobs with an id starting with fail plot one emoji fewer
+    count_plot = len(job['weights']) - (1 if str(job['id']).startswith('fail') else 0)
+    return FakeImage(), count_plot
+
+def write_jobs(tmp_path, list_job):
+    list_line = [job if isinstance(job, str) else json.dumps(job) for job in list_job]
+    file_job = tmp_path / 'jobs.jsonl'
+    file_job.write_text('\n'.join(list_line) + '\n', encoding='utf-8')
+    return str(file_job)
+
+def make_job(tmp_path, name, **kwargs):
+    job = {'id': name, 'canvas': 'ellipse', 'width': 72*10, 'height': 72*5, 'vendor': 'Twitter', 'weights': {'1f602': 1.3, '1f4a7': 1.2}, 'output': str(tmp_path / 'out' / (name + '.png'))}
+    job.update(kwargs)
+    return job
+
+def run(file_job, overwrite=False):
+    file_report = io.StringIO()
+    with open(file_job, encoding='utf-8') as f:
+        dict_status = batch.run_batch(f, file_report, workers=2, overwrite=overwrite)
+    list_record = [json.loads(line) for line in file_report.getvalue().splitlines()]
+    return dict_status, list_record
+
+def test_resume_and_overwrite(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, 'render_job', fake_render_job)
+    file_job = write_jobs(tmp_path, [make_job(tmp_path, 'a'), make_job(tmp_path, 'b')])
+    dict_status, list_record = run(file_job)
+    assert dict_status == {'ok': 2}
+    for record in list_record:
+        for key in ['status', 'placed', 'total', 'render_seconds', 'write_seconds']:
+            assert key in record
+        assert record['placed'] == record['total'] == 2
+        assert os.path.exists(record['output'])
+    # a second run skips all jobs done
+    dict_status, list_record = run(file_job)
+    assert dict_status == {'skipped': 2}
+    # overwrite renders them again
+    dict_status, list_record = run(file_job, overwrite=True)
+    assert dict_status == {'ok': 2}
+    assert sorted(os.listdir(tmp_path / 'out')) == ['a.png', 'b.png']
+
+def test_bad_jobs_do_not_stop_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, 'render_job', fake_render_job)
+    list_job = [
+        '{"weights": ',
+        make_job(tmp_path, 'vendor', vendor='Unknown'),
+        make_job(tmp_path, 'mask', canvas='masked'),
+        make_job(tmp_path, 'color', canvas='masked', mask='twitter-logo.png', contour_color='blue'),
+        make_job(tmp_path, 'height', height=None),
+        make_job(tmp_path, 'width', width=True),
+        make_job(tmp_path, 'empty', weights={}),
+        make_job(tmp_path, 'list', weights=['1f602']),
+        make_job(tmp_path, 'zero', weights={'1f602': 1.3, '1f4a7': 0}),
+        make_job(tmp_path, 'string', weights={'1f602': '1.3'}),
+        make_job(tmp_path, 'fail'),
+        make_job(tmp_path, 'ok'),
+        make_job(tmp_path, 'duplicate', output=str(tmp_path / 'out' / 'ok.png')),
+    ]
+    dict_status, list_record = run(write_jobs(tmp_path, list_job))
+    assert [record['status'] for record in list_record] == ['error']*10 + ['failed', 'ok', 'error']
+    assert all('error' in record for record in list_record if record['status'] == 'error')
+    assert sorted(os.listdir(tmp_path / 'out')) == ['ok.png']
+
+def test_main_exit_code(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, 'render_job', fake_render_job)
+    file_report = str(tmp_path / 'report.jsonl')
+    file_job = write_jobs(tmp_path, [make_job(tmp_path, 'ok')])
+    assert batch.main([file_job, '--report', file_report]) == 0
+    file_job = write_jobs(tmp_path, [make_job(tmp_path, 'fail')])
+    assert batch.main([file_job, '--report', file_report]) == 1
+    file_job = write_jobs(tmp_path, ['not json'])
+    assert batch.main([file_job, '--report', file_report]) == 1
+    with open(file_report, encoding='utf-8') as f:
+        assert [json.loads(line)['status'] for line in f] == ['ok', 'failed', 'error']
+    # the number of workers is rejected before any job is read
+    with pytest.raises(SystemExit):
+        batch.main([file_job, '--report', file_report, '--workers', '0'])
+
+def test_canvas_template_cache(tmp_path):
+    # render tiny rectangle canvases for real, jobs with the same canvas spec share one template
+    dict_canvas_template = {}
+    job_a = make_job(tmp_path, 'a', canvas='rectangle', width=144, height=72)
+    job_b = make_job(tmp_path, 'b', canvas='rectangle', width=144, height=72, weights={'1f602': 1.0, '1f4a7': 2.0})
+    job_c = make_job(tmp_path, 'c', canvas='rectangle', width=144, height=72, canvas_color='green')
+    assert batch.get_canvas_key(job_a) == batch.get_canvas_key(job_b) != batch.get_canvas_key(job_c)
+    for job in [job_a, job_b]:
+        canvas_img_plot, count_plot = batch.render_job(job, dict_canvas_template)
+        assert count_plot == len(job['weights'])
+        assert canvas_img_plot.size == (144, 72)
+    assert list(dict_canvas_template) == [batch.get_canvas_key(job_a)]
+    batch.render_job(job_c, dict_canvas_template)
+    assert len(dict_canvas_template) == 2
+
+if __name__ == '__main__':
+    # render all jobs in the JSONL job file, the two ellipse jobs share one canvas template
+    # jobs whose outputs already exist are skipped, so rerunning resumes an interrupted batch
+    with open('batch_jobs.jsonl', encoding='utf-8') as file_job:
+        dict_status = batch.run_batch(file_job, sys.stdout, workers=4)
+    print(dict_status)
+
+    # the same batch from the command line:
+    # python -m EmojiCloud batch_jobs.jsonl --report batch_report.jsonl